@@ -1,12 +1,24 @@
 import re
-from collections import defaultdict, Counter
-from nltk.tokenize import word_tokenize, sent_tokenize
+import heapq
+from array import array
+from collections import defaultdict, Counter, OrderedDict
 import math
 
+# Characters that can appear in the normalized training corpus, used to encode
+# contexts as integers for the dense per-context arrays
+ALPHABET = " abcdefghijklmnopqrstuvwxyz^$"
+CHAR_TO_INT = {char: code for code, char in enumerate(ALPHABET)}
+
 class NgramCharacterModel:
+    CACHE_SIZE = 4096
+    ALPHA = 0.01
+    VOCAB_SIZE = 27
+
     def __init__(self, corpus, n):
         """Initialize the n-gram character model with a given corpus and context length n."""
         self.n = n
+        self.prediction_cache = OrderedDict()
+        self.resolved_contexts = {}
         self.counts = [defaultdict(lambda: defaultdict(int)) for _ in range(n + 1)]
         self.contexts = [defaultdict(int) for _ in range(n + 1)]
 
@@ -14,81 +26,240 @@ class NgramCharacterModel:
         corpus = re.sub(r'[^a-zA-Z\s]', '', corpus.lower())
         corpus = re.sub(r'\s+', ' ', corpus).strip()
 
-        sentences = sent_tokenize(corpus)
-        words = []
-        
-        for sentence in sentences:
-            tokens = word_tokenize(sentence)
-            if tokens:
-                words.extend(['^'] * n + tokens + ['$'])
+        # Punctuation is already stripped, so the corpus is a single sentence of
+        # space-separated words and a plain split matches the NLTK tokenizers
+        tokens = corpus.split()
+        words = ['^'] * n + tokens + ['$'] if tokens else []
         
-        self.words = list(set(w for w in words if w not in {'^', '$'}))
-        corpus = ' '.join(words)
+        # Counter keys are already the unique words; keep them most frequent first
         self.word_freq = Counter(words)
+        self.words = sorted((w for w in self.word_freq if w not in {'^', '$'}),
+                            key=lambda w: -self.word_freq[w])
+        corpus = ' '.join(words)
+        self._build_trie()
         
         self._train(corpus)
         self._calculate_backoff_weights()
 
+    def _build_trie(self):
+        """Build a prefix trie over the vocabulary for fast candidate lookup."""
+        # Each node is [children, word, max_boost]: word is set if a vocabulary word ends
+        # there, max_boost is the largest log frequency boost of any word in its subtree
+        self.trie = [{}, None, math.inf]
+        # log(1 + freq_boost) per word, added to the log-probability when ranking
+        self.log_freq_boost = {}
+        for word in self.words:
+            boost = math.log1p(math.log(1 + self.word_freq[word]) / 10.0)
+            self.log_freq_boost[word] = boost
+            node = self.trie
+            for char in word:
+                children = node[0]
+                if char not in children:
+                    # Words are inserted most frequent first, so the word creating a node
+                    # has the largest boost in its subtree
+                    children[char] = [{}, None, boost]
+                node = children[char]
+            node[1] = word
+
+    def _find_node(self, context):
+        """Return the trie node reached by following the context, if any."""
+        node = self.trie
+        for char in context:
+            node = node[0].get(char)
+            if node is None:
+                return None
+        return node
+
+    def _top_candidates(self, context, node, top_k):
+        """Find the top_k log-scored words below a trie node, sharing work across common prefixes."""
+        # Min-heap of the best (log_score, word) pairs found so far
+        top = []
+        start_context = context[-min(len(context), self.n - 1):]
+        stack = [(node, start_context, 0.0, 0, math.inf)]
+        while stack:
+            node, curr_context, log_prob, depth, bound = stack.pop()
+            if len(top) == top_k and bound < top[0][0]:
+                continue
+            children, word, _ = node
+            if word is not None:
+                log_score = log_prob + self.log_freq_boost[word] - math.log1p(0.1 * depth)
+                if len(top) < top_k:
+                    heapq.heappush(top, (log_score, word))
+                elif log_score > top[0][0]:
+                    heapq.heapreplace(top, (log_score, word))
+
+            # Every child of this node shares the same context distribution
+            log_probs, log_unseen = self._context_log_probs(curr_context)
+            for char, child in children.items():
+                # Character log-probabilities are <= 0 and the length penalty only grows,
+                # so no word below the child can beat this bound
+                child_log_prob = log_prob + log_probs.get(char, log_unseen)
+                child_bound = child_log_prob + child[2] - math.log1p(0.1 * (depth + 1))
+                if len(top) == top_k and child_bound < top[0][0]:
+                    continue
+                next_context = (curr_context + char)[-min(len(curr_context) + 1, self.n - 1):]
+                stack.append((child, next_context, child_log_prob, depth + 1, child_bound))
+        return sorted(top, reverse=True)
+
     def _train(self, corpus):
         """Train the model by collecting n-gram statistics."""
-        for i in range(len(corpus) - self.n + 1):
-            for j in range(1, self.n + 1):
-                if i >= j - 1:
-                    context = corpus[i - (j - 1):i]
-                    next_char = corpus[i]
-                    self.counts[j][context][next_char] += 1
-                    self.contexts[j][context] += 1
+        n = self.n
+        end = len(corpus) - n + 1
+        # Zipping n shifted copies of the corpus yields the full n-grams ending at
+        # positions n-1 .. end-1 as character tuples, without slicing per position
+        num_ngrams = max(end - (n - 1), 0)
+        ngrams = Counter(zip(*(corpus[k:k + num_ngrams] for k in range(n))))
+
+        # Shorter j-grams ending at those positions are suffixes of the n-grams, so
+        # they are derived from the few distinct n-grams instead of the corpus
+        grams = Counter()
+        for ngram, count in ngrams.items():
+            for j in range(1, n + 1):
+                grams[ngram[-j:]] += count
+        # Positions before n-1 have no full n-gram and are counted directly
+        for i in range(min(n - 1, end)):
+            for j in range(1, i + 2):
+                grams[tuple(corpus[i - (j - 1):i + 1])] += 1
+
+        for gram, count in grams.items():
+            j = len(gram)
+            context, next_char = ''.join(gram[:-1]), gram[-1]
+            self.counts[j][context][next_char] += count
+            self.contexts[j][context] += count
+
+    def _encode_context(self, context):
+        """Encode a context as a base-len(ALPHABET) integer, or None if it has unknown characters."""
+        code = 0
+        for char in context:
+            digit = CHAR_TO_INT.get(char)
+            if digit is None:
+                return None
+            code = code * len(ALPHABET) + digit
+        return code
 
     def _calculate_backoff_weights(self):
-        """Compute backoff weights for smoothing."""
-        self.backoff_weights = [defaultdict(float) for _ in range(self.n + 1)]
+        """Compute backoff weights and smoothed probability denominators."""
+        # Dense arrays indexed by context code; order j holds len(ALPHABET) ** (j - 1) contexts
+        self.backoff_weights = [array('f') for _ in range(self.n + 1)]
+        self.inv_denom = [array('d') for _ in range(self.n + 1)]
+        self.log_inv_denom = [array('d') for _ in range(self.n + 1)]
+        for j in range(1, self.n + 1):
+            size = len(ALPHABET) ** (j - 1)
+            self.backoff_weights[j] = array('f', [0.0]) * size
+            self.inv_denom[j] = array('d', [0.0]) * size
+            self.log_inv_denom[j] = array('d', [0.0]) * size
+
         for j in range(2, self.n + 1):
             for context in self.contexts[j]:
                 shorter_context = context[1:]
-                self.backoff_weights[j][context] = 0.4 if shorter_context in self.contexts[j - 1] else 0.1
+                code = self._encode_context(context)
+                self.backoff_weights[j][code] = 0.4 if shorter_context in self.contexts[j - 1] else 0.1
+
+        # 1 / (total_count + alpha * vocab_size) per context, plus its log for word scoring;
+        # a zero inv_denom marks a context without statistics
+        for j in range(1, self.n + 1):
+            for context, total_count in self.contexts[j].items():
+                if total_count:
+                    code = self._encode_context(context)
+                    denom = total_count + self.ALPHA * self.VOCAB_SIZE
+                    self.inv_denom[j][code] = 1.0 / denom
+                    self.log_inv_denom[j][code] = -math.log(denom)
+
+        # Lookup tables of smoothed log-probabilities, so scoring needs no math.log per char
+        self.log_char_probs = [{} for _ in range(self.n + 1)]
+        self.log_unseen_probs = [{} for _ in range(self.n + 1)]
+        for j in range(1, self.n + 1):
+            for context, total_count in self.contexts[j].items():
+                if not total_count:
+                    continue
+                log_inv_denom = self.log_inv_denom[j][self._encode_context(context)]
+                self.log_char_probs[j][context] = {
+                    char: math.log(char_count + self.ALPHA) + log_inv_denom
+                    for char, char_count in self.counts[j][context].items()
+                }
+                self.log_unseen_probs[j][context] = math.log(self.ALPHA) + log_inv_denom
+
+    def _resolve_context(self, context):
+        """Find the highest order and context with statistics, memoized per context."""
+        # Only the last n-1 characters (and whether there are any) affect the backoff
+        key = context[-(self.n - 1):]
+        resolved = self.resolved_contexts.get(key)
+        if resolved is None:
+            resolved = (0, '', 0)
+            max_order = min(len(key) + 1, self.n)
+            for j in range(max_order, 0, -1):
+                curr_context = key[-(j - 1):]
+                if len(curr_context) != j - 1:
+                    continue
+                code = self._encode_context(curr_context)
+                if code is not None and self.inv_denom[j][code]:
+                    resolved = (j, curr_context, code)
+                    break
+            self.resolved_contexts[key] = resolved
+        return resolved
+
+    def _context_log_probs(self, context):
+        """Return the log-probability table and unseen-character log-probability for a context."""
+        j, curr_context, _ = self._resolve_context(context)
+        if j == 0:
+            return {}, -math.log(self.VOCAB_SIZE)
+        return self.log_char_probs[j][curr_context], self.log_unseen_probs[j][curr_context]
 
     def get_char_probability(self, context, char):
         """Estimate the probability of a character based on its context."""
-        max_order = min(len(context) + 1, self.n)
-        for j in range(max_order, 0, -1):
-            curr_context = context[-(j - 1):]
-            if curr_context in self.counts[j]:
-                total_count = self.contexts[j][curr_context]
-                char_count = self.counts[j][curr_context].get(char, 0)
-                if total_count:
-                    alpha = 0.01
-                    vocab_size = 27
-                    prob = (char_count + alpha) / (total_count + alpha * vocab_size)
-                    return prob
-        return 1.0 / 27
+        j, curr_context, code = self._resolve_context(context)
+        if j == 0:
+            return 1.0 / self.VOCAB_SIZE
+        char_count = self.counts[j][curr_context].get(char, 0)
+        return (char_count + self.ALPHA) * self.inv_denom[j][code]
+
+    def get_char_log_probability(self, context, char):
+        """Estimate the log-probability of a character based on its context."""
+        log_probs, log_unseen = self._context_log_probs(context)
+        return log_probs.get(char, log_unseen)
 
     def get_word_probability(self, context, word):
         """Estimate word probability using character-level probabilities."""
         if not word.startswith(context):
             return 0.0
+        return math.exp(self.get_word_log_probability(context, word))
+
+    def get_word_log_probability(self, context, word):
+        """Estimate the log of the word probability, as used for ranking predictions."""
+        if not word.startswith(context):
+            return -math.inf
         
         log_prob = 0.0
         curr_context = context[-min(len(context), self.n - 1):]
         
         for char in word[len(context):]:
-            char_prob = self.get_char_probability(curr_context, char)
-            if char_prob > 0:
-                log_prob += math.log(char_prob)
-            else:
-                return 0.0
+            log_prob += self.get_char_log_probability(curr_context, char)
             curr_context = (curr_context + char)[-min(len(curr_context) + 1, self.n - 1):]
         
-        prob = math.exp(log_prob)
         freq_boost = math.log(1 + self.word_freq.get(word, 0)) / 10.0
-        length_penalty = 1.0 / (1.0 + 0.1 * (len(word) - len(context)))
-        return prob * (1.0 + freq_boost) * length_penalty
+        return log_prob + math.log1p(freq_boost) - math.log1p(0.1 * (len(word) - len(context)))
 
     def predict_top_words(self, context, top_k=10):
         """Retrieve the most probable words given a context."""
         context = context.lower()
-        candidates = [word for word in self.words if word.startswith(context)]
-        scored_candidates = [(word, self.get_word_probability(context, word)) for word in candidates]
-        return sorted(scored_candidates, key=lambda x: x[1], reverse=True)[:top_k]
+        key = (context, top_k)
+        if key in self.prediction_cache:
+            self.prediction_cache.move_to_end(key)
+            return list(self.prediction_cache[key])
+
+        node = self._find_node(context)
+        if node is None or top_k <= 0:
+            top_words = []
+        else:
+            # Rank on log-scores; only the returned top_k are converted to probabilities
+            top_words = [(word, math.exp(log_score))
+                         for log_score, word in self._top_candidates(context, node, top_k)]
+
+        # The model is immutable after training, so cached results never go stale
+        self.prediction_cache[key] = top_words
+        if len(self.prediction_cache) > self.CACHE_SIZE:
+            self.prediction_cache.popitem(last=False)
+        return list(top_words)
 
     def _generate_word(self, prefix):
         """Generate the most probable word completion."""
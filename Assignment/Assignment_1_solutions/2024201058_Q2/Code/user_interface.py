@@ -1,19 +1,26 @@
 import curses
-import re
 import sys
 import os
 import time
+import textwrap
 from typing import List
 from ngram import NgramCharacterModel
 
 class TerminalUI:
+    PANELS = ("suggestions", "text", "input", "scores")
+
     def __init__(self, prediction_model, text_content=None, auto_mode=False, delay=0.5):
         self.screen = None
         self.suggestions = []
         self.current_suggestion_idx = 0
+        # Context the current suggestions were computed for, or None if there are none
+        self._last_suggestion_context = None
         self.scores = []
         self.text_content = text_content
-        self.user_input = ""
+        self._wrap_cache = {}  # panel width -> wrapped text_content lines
+        # Input is kept as a list of characters so edits don't copy the whole string
+        self._buf = []
+        self._user_input_cache = ""
         self.cursor_pos = 0
         self.cursor_row = 1
         self.cursor_col = 0
@@ -22,6 +29,8 @@ class TerminalUI:
         self.text_panel = None
         self.input_panel = None
         self.scores_panel = None
+        # Panels whose content changed since the last update_ui()
+        self.dirty_panels = set()
 
         self.prediction_model = prediction_model
 
@@ -31,10 +40,24 @@ class TerminalUI:
         # (k_i, l_i) for each completed word; k_i = typed letters, l_i = final word length
         self.word_stats = []
         self.tabKeyCount = 0
+        # Running sums of k_i and l_i over word_stats
+        self._total_letters = 0
+        self._total_final = 0
 
         self.auto_mode = auto_mode
         self.delay = delay
 
+    @property
+    def user_input(self) -> str:
+        if self._user_input_cache is None:
+            self._user_input_cache = "".join(self._buf)
+        return self._user_input_cache
+
+    @user_input.setter
+    def user_input(self, value: str) -> None:
+        self._buf = list(value)
+        self._user_input_cache = value
+
     def calculate_scores(self, text: str) -> List[float]:
         """
         1) total letters typed = sum(k_i)
@@ -42,9 +65,9 @@ class TerminalUI:
         3) avg letters/word = sum(k_i)/sum(l_i)
         4) avg tabs/word = total_tab_keys/total_words
         """
-        total_letters = sum(k for (k, _) in self.word_stats)
+        total_letters = self._total_letters
         total_tabs = self.tabKeyCount
-        sum_of_final_letters = sum(l for (_, l) in self.word_stats)
+        sum_of_final_letters = self._total_final
 
         if sum_of_final_letters > 0:
             avg_letters_per_word = total_letters / sum_of_final_letters
@@ -59,36 +82,44 @@ class TerminalUI:
 
         return [total_letters, total_tabs, avg_letters_per_word, avg_tabs_per_word]
 
-    def find_last_word_start(self, text: str, cursor_pos: int) -> int:
-        if cursor_pos == 0:
-            return 0
-        text_before_cursor = text[:cursor_pos]
-        match = re.search(r"[^\s]*$", text_before_cursor)
-        return cursor_pos - len(match.group(0)) if match else cursor_pos
+    def find_last_word_start(self, text, cursor_pos: int) -> int:
+        """Scan back from the cursor to the last whitespace; text may be a str or the input buffer."""
+        word_start = cursor_pos
+        while word_start > 0 and text[word_start - 1] not in (' ', '\t', '\n'):
+            word_start -= 1
+        return word_start
 
     def get_current_word(self) -> str:
-        word_start = self.find_last_word_start(self.user_input, self.cursor_pos)
-        return self.user_input[word_start:self.cursor_pos]
+        word_start = self.find_last_word_start(self._buf, self.cursor_pos)
+        return "".join(self._buf[word_start:self.cursor_pos])
 
     def replace_current_word(self, new_word: str) -> None:
-        word_start = self.find_last_word_start(self.user_input, self.cursor_pos)
-        self.user_input = (self.user_input[:word_start]
-                           + new_word
-                           + self.user_input[self.cursor_pos:])
+        word_start = self.find_last_word_start(self._buf, self.cursor_pos)
+        self._buf[word_start:self.cursor_pos] = new_word
+        self._user_input_cache = None
         self.cursor_pos = word_start + len(new_word)
 
     def finalize_current_word_stats(self) -> None:
-        words = self.user_input.strip().split()
-        if not words:
+        # Locate the last word of the input directly in the buffer instead of
+        # joining and splitting the whole text
+        word_end = len(self._buf)
+        while word_end > 0 and self._buf[word_end - 1].isspace():
+            word_end -= 1
+        word_start = word_end
+        while word_start > 0 and not self._buf[word_start - 1].isspace():
+            word_start -= 1
+        if word_start == word_end:
             self.current_word_keystrokes = 0
             return
 
-        last_word = words[-1]
-        l_i = sum(1 for c in last_word if c.isalpha())  # final word length (alpha only)
+        l_i = sum(map(str.isalpha, self._buf[word_start:word_end]))  # final word length (alpha only)
         k_i = self.current_word_keystrokes
 
         if l_i > 0:
             self.word_stats.append((k_i, l_i))
+            self._total_letters += k_i
+            self._total_final += l_i
+            self.dirty_panels.add("scores")
 
         self.current_word_keystrokes = 0
 
@@ -119,17 +150,11 @@ class TerminalUI:
         self.text_panel.box()
         self.text_panel.addstr(0, 2, " Text Content ")
 
-        words = self.text_content.split()
-        lines = []
-        current_line = ""
-        for word in words:
-            if len((current_line + " " + word).strip()) > w - 4:
-                lines.append(current_line)
-                current_line = word
-            else:
-                current_line = (current_line + " " + word).strip()
-        if current_line:
-            lines.append(current_line)
+        lines = self._wrap_cache.get(w)
+        if lines is None:
+            lines = textwrap.wrap(" ".join(self.text_content.split()), w - 4,
+                                  break_long_words=False, break_on_hyphens=False)
+            self._wrap_cache[w] = lines
 
         for i, line in enumerate(lines):
             if i < h - 2:
@@ -218,8 +243,10 @@ class TerminalUI:
             return True
         if key == 27:  # ESC
             return False
+        self.dirty_panels.add("input")
         if key == 9:  # Tab
             self.tabKeyCount += 1
+            self.dirty_panels.update(("suggestions", "scores"))
             if self.suggestions:
                 self.current_suggestion_idx = (self.current_suggestion_idx + 1) % len(self.suggestions)
             return True
@@ -229,15 +256,14 @@ class TerminalUI:
             self.finalize_current_word_stats()
             self.suggestions = []
             self.current_suggestion_idx = 0
+            self._last_suggestion_context = None
+            self.dirty_panels.add("suggestions")
             return True
 
         if key in (curses.KEY_BACKSPACE, 127, 8):
             if self.cursor_pos > 0:
-                char_deleted = self.user_input[self.cursor_pos - 1]
-                self.user_input = (
-                    self.user_input[:self.cursor_pos - 1]
-                    + self.user_input[self.cursor_pos:]
-                )
+                char_deleted = self._buf.pop(self.cursor_pos - 1)
+                self._user_input_cache = None
                 self.cursor_pos -= 1
                 if char_deleted.isalpha() and self.current_word_keystrokes > 0:
                     self.current_word_keystrokes -= 1
@@ -254,7 +280,7 @@ class TerminalUI:
             return True
 
         if key == curses.KEY_RIGHT:
-            if self.cursor_pos < len(self.user_input):
+            if self.cursor_pos < len(self._buf):
                 self.cursor_pos += 1
                 current_word = self.get_current_word()
                 self.update_suggestions(current_word)
@@ -262,9 +288,8 @@ class TerminalUI:
 
         if 32 <= key <= 126:
             char = chr(key)
-            self.user_input = (
-                self.user_input[:self.cursor_pos] + char + self.user_input[self.cursor_pos:]
-            )
+            self._buf.insert(self.cursor_pos, char)
+            self._user_input_cache = None
             self.cursor_pos += 1
 
             if char.isalpha():
@@ -283,15 +308,30 @@ class TerminalUI:
         To store only the words, we slice off the probability portion
         from predict_top_words result.
         """
-        top_results = self.prediction_model.predict_top_words(context, top_k=10)
-        self.suggestions = [item[0] for item in top_results]
+        # Same context as last time: the suggestions are unchanged, only the selection resets
+        if context != self._last_suggestion_context:
+            self._last_suggestion_context = context
+            top_results = self.prediction_model.predict_top_words(context, top_k=10)
+            self.suggestions = [item[0] for item in top_results]
         self.current_suggestion_idx = 0
+        self.dirty_panels.add("suggestions")
 
-    def update_ui(self):
-        self.draw_suggestions_panel()
-        self.draw_text_panel()
+    def update_ui(self, dirty=None):
+        """
+        Redraw the panels named in dirty (all panels if None); the input
+        panel is always redrawn so the cursor stays in place.
+        """
+        panels = set(self.PANELS if dirty is None else dirty)
+        panels.add("input")
+        self.dirty_panels.clear()
+
+        if "suggestions" in panels:
+            self.draw_suggestions_panel()
+        if "text" in panels:
+            self.draw_text_panel()
         self.draw_input_panel()
-        self.draw_scores_panel()
+        if "scores" in panels:
+            self.draw_scores_panel()
         curses.doupdate()
 
     def run_automated_test(self):
@@ -310,7 +350,7 @@ class TerminalUI:
             for letter in word:
                 # Add the next letter
                 keep_running = self.handle_input(ord(letter))
-                self.update_ui()
+                self.update_ui(self.dirty_panels)
                 if not keep_running:
                     return
                 time.sleep(self.delay)
@@ -326,13 +366,13 @@ class TerminalUI:
                         # Press Tab enough times to select it
                         for _ in range(target_index):
                             keep_running = self.handle_input(9)  # Tab
-                            self.update_ui()
+                            self.update_ui(self.dirty_panels)
                             if not keep_running:
                                 return
                             time.sleep(self.delay)
                         # Press Enter to accept suggestion
                         keep_running = self.handle_input(10)  # Enter
-                        self.update_ui()
+                        self.update_ui(self.dirty_panels)
                         if not keep_running:
                             return
                         time.sleep(self.delay)
@@ -344,7 +384,7 @@ class TerminalUI:
                 # If we're here, we typed the entire word manually
                 # Just press space to move to next word
                 keep_running = self.handle_input(ord(' '))
-                self.update_ui()
+                self.update_ui(self.dirty_panels)
                 if not keep_running:
                     return
                 time.sleep(self.delay)
@@ -352,7 +392,7 @@ class TerminalUI:
                 # If we completed via suggestion, we still need to type space
                 # to separate from the next word
                 keep_running = self.handle_input(ord(' '))
-                self.update_ui()
+                self.update_ui(self.dirty_panels)
                 if not keep_running:
                     return
                 time.sleep(self.delay)
@@ -403,6 +443,7 @@ class TerminalUI:
                     running = self.handle_input(key)
 
                     if key == curses.KEY_RESIZE:
+                        self._wrap_cache.clear()
                         max_y, max_x = self.screen.getmaxyx()
                         suggestions_height = 3
                         text_height = (max_y - 6) // 2 + 2
@@ -412,8 +453,9 @@ class TerminalUI:
                         self.text_panel = curses.newwin(text_height, max_x, suggestions_height, 0)
                         self.input_panel = curses.newwin(input_height, max_x, suggestions_height + text_height, 0)
                         self.scores_panel = curses.newwin(scores_height, max_x, suggestions_height + text_height + input_height, 0)
-
-                    self.update_ui()
+                        self.update_ui()
+                    else:
+                        self.update_ui(self.dirty_panels)
 
         finally:
             # If user quits mid-word, finalize it